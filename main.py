@@ -1,4 +1,13 @@
-import math
+import mmap
+import sys
+from functools import lru_cache
+
+# optional speedup: the allocator and the COPY gather loop are compiled when numba is installed
+try:
+    import numba
+    import numpy as np
+except ImportError:
+    numba = None
 
 ### CONSTANTS AND INITIALIZATION ###
 
@@ -14,23 +23,49 @@ ROOT_SIZE = UAs_for_ROOT * UA  # size in bytes
 FREE = 0
 FAT_RESERVED = 1
 ROOT_RESERVED = 2
-EOF = 3  # end of file
+EOF = 0xFFFF  # end of file, kept out of the range of valid UA indices
 BAD = 4
 
-FAT = [FREE] * TOTAL_UAs  # each UA will be marked as FREE
+# content sources for CREATE, each prebuilt as a tile the size of the whole disk
+SOURCES = {
+    "-ALFA": b"abcdefghijklmnopqrstuvwxyz",
+    "-NUM": b"0123456789",
+    "-HEX": b"0123456789ABCDEF",
+}
+PRETILED = {mode: memoryview((source * (HDD_SIZE // len(source) + 1))[:HDD_SIZE])
+            for mode, source in SOURCES.items()}
+
+DATA_START = UAs_for_FAT + UAs_for_ROOT  # first UA available for file data
+NEXT_FREE_HINT = DATA_START  # the allocator starts searching for free UAs from here
+
+# the HDD is an anonymous memory map, private to this process and zero-filled like a new disk
+HDD = mmap.mmap(-1, HDD_SIZE)
+HDD_MV = memoryview(HDD)  # zero-copy view used for all reads from HDD
+# the FAT lives in its own region at the start of the HDD: one uint16 per UA (TOTAL_UAs * 2 == FAT_SIZE)
+FAT = HDD_MV[:TOTAL_UAs * 2].cast('H')  # each UA starts as FREE
 ROOT = []  # each entry here is an instance of File class
-HDD = bytearray(HDD_SIZE)
+ROOT_INDEX = {}  # maps (name, extension) to the position of the entry in ROOT
+FREE_BITMAP = bytearray(TOTAL_UAs // 8)  # 1 bit per UA, set while the UA is FREE
 
 for ind in range(UAs_for_FAT):
     FAT[ind] = FAT_RESERVED  # first NR_FAT UAs are reserved for FAT
 for ind in range(UAs_for_FAT, UAs_for_FAT + UAs_for_ROOT):
     FAT[ind] = ROOT_RESERVED  # then reserves NR_ROOT UAs for ROOT
+FREE_BITMAP[DATA_START // 8:] = b"\xff" * ((TOTAL_UAs - DATA_START) // 8)  # the data region starts FREE
+
+if numba is not None:
+    # numpy views sharing memory with the structures above, used by the compiled helpers
+    FAT_NP = np.frombuffer(FAT, dtype=np.uint16)
+    HDD_NP = np.frombuffer(HDD, dtype=np.uint8)
+    FREE_BITMAP_NP = np.frombuffer(FREE_BITMAP, dtype=np.uint8)
 
 
 class File:
     """
     UA's 16 bytes limit is hardcoded in this class
     """
+    __slots__ = ('name', 'extension', 'size', 'startUA', 'attr')
+
     def __init__(self, name, extension, size, startUA, attr):
         self.name = name[:8]
         self.extension = extension[:3]
@@ -42,61 +77,190 @@ class File:
 ### HELPER FUNCTIONS ###
 
 def generateContent(length, mode):
-    if mode == "-ALFA":
-        source = b"abcdefghijklmnopqrstuvwxyz"
-    elif mode == "-NUM":
-        source = b"0123456789"
-    elif mode == "-HEX":
-        source = b"0123456789ABCDEF"
-    else:
-        return b""
+    tile = PRETILED.get(mode)
+    if tile is None or length <= 0:
+        return b""  # reported as an invalid CREATE, like an unknown mode
+    # zero-copy slice of the prebuilt tile, no file can be larger than the disk
+    return tile[:length]
 
-    # this repeats the source until it reaches 'length' bytes
-    repeated = source * (length // len(source) + 1)
-    # then returns the first 'length' bytes
-    return repeated[:length]
+
+# the parse caches are bounded, so a long session cannot grow them without limit
+@lru_cache(maxsize=256)
+def tokenizeCommand(command):
+    return tuple(command.split())
 
 
 def splitCommand(command, expectedArgs):
-    parts = command.split()
+    parts = tokenizeCommand(command)
     if len(parts) != expectedArgs:
         return None
     return parts
 
 
+@lru_cache(maxsize=1024)
 def splitFileName(fileName):
-    if '.' not in fileName:
-        return None, None
-    return fileName.split('.')
+    # splits on the last dot, so names like "a.b.c" keep "a.b" as the name
+    name, sep, extension = fileName.rpartition('.')
+    return (name, extension) if sep else (None, None)
 
 
-def findFileIndex(name, extension):
-    for i, f in enumerate(ROOT):
-        if f.name == name and f.extension == extension:
-            return i
-    return None
+def countUAs(size):
+    # number of UAs needed for 'size' bytes, rounded up with integer arithmetic
+    return -(-size // UA)
 
 
-def allocateUAsAndWrite(content, nr_UAs):
-    # finds all free UAs in the HDD
-    free_UAs = [i for i in range(UAs_for_FAT + UAs_for_ROOT, TOTAL_UAs) if FAT[i] == FREE]
-    if len(free_UAs) < nr_UAs:
-        return None, False  # not enough space
+def findFileIndex(name, extension):
+    # ROOT_INDEX is keyed like File stores names: 8 chars for the name, 3 for the extension
+    return ROOT_INDEX.get((name[:8], extension[:3]))
+
+
+def getChain(startUA):
+    # follows the FAT from startUA and returns the UAs of the chain in order
+    chain = []
+    append = chain.append
+    fat = FAT
+    ua = startUA
+    while ua != EOF:
+        append(ua)
+        ua = fat[ua]
+    return chain
+
+
+def setUAFree(ua, isFree):
+    # keeps FREE_BITMAP in sync with the FAT
+    if isFree:
+        FREE_BITMAP[ua >> 3] |= 1 << (ua & 7)
+    else:
+        FREE_BITMAP[ua >> 3] &= ~(1 << (ua & 7)) & 0xFF
+
+
+def collectFreeUAs(low, high, allocated, found):
+    # reads FREE_BITMAP 64 UAs at a time and fills 'allocated' with the free UAs in [low, high)
+    for off in range(low // 64, (high + 63) // 64):
+        word = int.from_bytes(FREE_BITMAP[off * 8:off * 8 + 8], 'little')
+        base = off * 64
+        if base < low:
+            word &= ~((1 << (low - base)) - 1)  # drops the UAs before 'low'
+        if base + 64 > high:
+            word &= (1 << (high - base)) - 1  # drops the UAs from 'high' onwards
+        while word:
+            lsb = word & -word  # lowest free UA left in this word
+            allocated[found] = base + lsb.bit_length() - 1
+            found += 1
+            if found == len(allocated):
+                return found
+            word ^= lsb
+    return found
+
+
+def collectFreeUAsKernel(bitmap, low, high, allocated, found):
+    # compiled counterpart of collectFreeUAs, in the same ascending order:
+    # reads FREE_BITMAP one byte (8 UAs) at a time and skips the bytes with no free UA
+    for off in range(low >> 3, (high + 7) >> 3):
+        byte = bitmap[off]
+        if byte == 0:
+            continue
+        for bit in range(8):
+            u = off * 8 + bit
+            if low <= u < high and (byte >> bit) & 1:
+                allocated[found] = u
+                found += 1
+                if found == len(allocated):
+                    return found
+    return found
+
+
+def allocateKernel(fat, bitmap, allocated, hint, dataStart, totalUAs, eof):
+    # same allocation as allocateUAs: from the hint to the end, then from dataStart
+    # fills 'allocated', chains it in the FAT and returns the new hint (-1 if there is not enough space)
+    nr_UAs = len(allocated)
+    found = collectFreeUAsKernel(bitmap, hint, totalUAs, allocated, 0)
+    if found < nr_UAs:
+        found = collectFreeUAsKernel(bitmap, dataStart, hint, allocated, found)
+    if found < nr_UAs:
+        return -1
 
-    # takes the first nr_UAs blocks then writes them
-    allocated = free_UAs[:nr_UAs]
     for i in range(nr_UAs):
-        # converts the UA index to a byte range ('start' to 'end')
-        start = allocated[i] * UA
-        end = start + UA
-        HDD[start:end] = content[i * UA:(i + 1) * UA]
+        u = allocated[i]
+        fat[u] = allocated[i + 1] if i < nr_UAs - 1 else eof
+        bitmap[u >> 3] = bitmap[u >> 3] & (0xFF ^ (1 << (u & 7)))
+    return allocated[nr_UAs - 1] + 1
+
+
+def copyChainKernel(fat, hdd, srcUA, dst, ua):
+    # copies the blocks of the chain starting at srcUA into the UAs listed in dst
+    u = int(srcUA)
+    for d in dst:
+        for b in range(ua):
+            hdd[d * ua + b] = hdd[u * ua + b]
+        u = int(fat[u])
+
+
+if numba is not None:
+    collectFreeUAsKernel = numba.njit(cache=True)(collectFreeUAsKernel)
+    allocateKernel = numba.njit(cache=True)(allocateKernel)
+    copyChainKernel = numba.njit(cache=True)(copyChainKernel)
+
+
+def allocateUAs(nr_UAs):
+    # reserves nr_UAs free UAs and chains them in the FAT
+    # returns their indices in chain order, or None if there is not enough space
+    global NEXT_FREE_HINT
+
+    if nr_UAs <= 0:
+        return None  # there is no chain to start, both paths below need at least one UA
+
+    if numba is not None:
+        allocated = np.empty(nr_UAs, dtype=np.int64)
+        hint = allocateKernel(FAT_NP, FREE_BITMAP_NP, allocated, NEXT_FREE_HINT, DATA_START, TOTAL_UAs, EOF)
+        if hint < 0:
+            NEXT_FREE_HINT = DATA_START
+            return None  # not enough space
+        NEXT_FREE_HINT = hint
+        return allocated.tolist()
+
+    # collects the first nr_UAs free UAs, scanning from the hint and wrapping once to DATA_START
+    allocated = [0] * nr_UAs
+    found = collectFreeUAs(NEXT_FREE_HINT, TOTAL_UAs, allocated, 0)
+    if found < nr_UAs:
+        found = collectFreeUAs(DATA_START, NEXT_FREE_HINT, allocated, found)
+    if found < nr_UAs:
+        NEXT_FREE_HINT = DATA_START
+        return None  # not enough space
+
+    # updates the FAT so each UA points to the next allocated UA
+    for i in range(nr_UAs - 1):
+        FAT[allocated[i]] = allocated[i + 1]
+        setUAFree(allocated[i], False)
+    FAT[allocated[-1]] = EOF
+    setUAFree(allocated[-1], False)
+
+    NEXT_FREE_HINT = allocated[-1] + 1
+    return allocated
+
+
+def writeUAs(allocated, content):
+    # writes each run of contiguous UAs with a single slice assignment,
+    # slicing through a view so no bytes are materialised
+    content_mv = memoryview(content)
+    nr_UAs = len(allocated)
+    runStart = 0
+    for i in range(1, nr_UAs + 1):
+        if i < nr_UAs and allocated[i] == allocated[i - 1] + 1:
+            continue  # the run goes on
+        # converts the run to a byte range ('start' to 'end')
+        block = content_mv[runStart * UA:i * UA]
+        start = allocated[runStart] * UA
+        end = start + len(block)  # the last block may be shorter than a UA
+        HDD[start:end] = block
+        runStart = i
 
-        if i < nr_UAs - 1:
-            # updates the FAT so each UA points to the next allocated UA
-            FAT[allocated[i]] = allocated[i + 1]
-        else:
-            FAT[allocated[i]] = EOF
 
+def allocateUAsAndWrite(content, nr_UAs):
+    allocated = allocateUAs(nr_UAs)
+    if allocated is None:
+        return None, False  # not enough space
+    writeUAs(allocated, content)
     return allocated[0], True  # return starting UA and success
 
 
@@ -107,12 +271,12 @@ def handleDIR(command):
         print("no files found")
         return
 
+    # builds the whole listing first, then prints it at once
     if "-a" in command:
-        for file in ROOT:
-            print(f"{file.name}.{file.extension}\t{file.size} bytes")
+        lines = [f"{file.name}.{file.extension}\t{file.size} bytes" for file in ROOT]
     else:
-        for file in ROOT:
-            print(f"{file.name}.{file.extension}")
+        lines = [f"{file.name}.{file.extension}" for file in ROOT]
+    print("\n".join(lines))
 
 
 def handleCREATE(command):
@@ -136,7 +300,7 @@ def handleCREATE(command):
         print(f"{name}.{extension} already exists")
         return
 
-    nr_UAs = math.ceil(size / UA)
+    nr_UAs = countUAs(size)
 
     content = generateContent(size, mode)
     if not content:
@@ -151,11 +315,14 @@ def handleCREATE(command):
 
     # adds the file to ROOT
     entry = File(name, extension, size, startUA, 0)
+    ROOT_INDEX[(entry.name, entry.extension)] = len(ROOT)
     ROOT.append(entry)
     print(f"{name}.{extension} created successfully")
 
 
 def handleDELETE(command):
+    global NEXT_FREE_HINT
+
     parts = splitCommand(command, 2)
     if parts is None:
         print("invalid DELETE command")
@@ -175,14 +342,23 @@ def handleDELETE(command):
         print("WARNING: file not found")
         return
 
-    startUA = ROOT[index].startUA  # index of the first used UA
-    # marks the occupied UAs in FAT as FREE
-    while startUA != EOF:
-        nextUA = FAT[startUA]
-        FAT[startUA] = FREE
-        startUA = nextUA if nextUA != EOF else EOF
-
+    chain = getChain(ROOT[index].startUA)
+    # the freed chain may lie before the hint, so the allocator should see it again
+    NEXT_FREE_HINT = min(NEXT_FREE_HINT, min(chain))
+    # marks the occupied UAs in FAT as FREE, building one bitmap mask per 64-UA word
+    masks = {}
+    for ua in chain:
+        FAT[ua] = FREE
+        masks[ua >> 6] = masks.get(ua >> 6, 0) | (1 << (ua & 63))
+    for off, mask in masks.items():
+        word = int.from_bytes(FREE_BITMAP[off * 8:off * 8 + 8], 'little') | mask
+        FREE_BITMAP[off * 8:off * 8 + 8] = word.to_bytes(8, 'little')
+
+    del ROOT_INDEX[(ROOT[index].name, ROOT[index].extension)]
     del ROOT[index]
+    # the entries after the deleted one moved back by one position
+    for i in range(index, len(ROOT)):
+        ROOT_INDEX[(ROOT[i].name, ROOT[i].extension)] = i
     print(f"{fileName} deleted successfully.")
 
 
@@ -208,8 +384,16 @@ def handleRENAME(command):
         print("WARNING: file not found")
         return
 
-    ROOT[index].name = newName
-    ROOT[index].extension = newExt
+    # renaming a file to its own name is allowed
+    if findFileIndex(newName, newExt) not in (None, index):
+        print("WARNING: destination file already exists")
+        return
+
+    entry = ROOT[index]
+    del ROOT_INDEX[(entry.name, entry.extension)]
+    entry.name = newName[:8]
+    entry.extension = newExt[:3]
+    ROOT_INDEX[(entry.name, entry.extension)] = index
     print(f"{oldFileName} renamed to {newFileName}")
 
 
@@ -244,53 +428,72 @@ def handleCOPY(command):
 
     srcFile = ROOT[srcIndex]
     size = srcFile.size
-    nr_UAs = math.ceil(size / UA)
-
-    # allocate UAs and copy content from source
-    content = bytearray()
-    currentUA = srcFile.startUA  # sets currentUA to the starting UA index
-    while currentUA != EOF:
-        # same logic as in the allocation function
-        start = currentUA * UA
-        end = start + UA
-        # adds the block to content
-        content += HDD[start:end]
-        # chains the FAT
-        currentUA = FAT[currentUA]
+    nr_UAs = countUAs(size)
 
-    startUA, success = allocateUAsAndWrite(content, nr_UAs)
-    if not success:
+    dst = allocateUAs(nr_UAs)
+    if dst is None:
         print("not enough free space to copy the file")
         return
 
+    # copies the source blocks straight into the allocated UAs, without an intermediate buffer
+    if numba is not None:
+        copyChainKernel(FAT_NP, HDD_NP, srcFile.startUA, np.array(dst, dtype=np.int64), UA)
+    else:
+        src = getChain(srcFile.startUA)
+        # copies each run that is contiguous in both chains with a single slice assignment
+        runStart = 0
+        for i in range(1, nr_UAs + 1):
+            if i < nr_UAs and src[i] == src[i - 1] + 1 and dst[i] == dst[i - 1] + 1:
+                continue  # the run goes on
+            # converts both runs to byte ranges, same logic as in writeUAs
+            length = (i - runStart) * UA
+            srcStart = src[runStart] * UA
+            dstStart = dst[runStart] * UA
+            HDD[dstStart:dstStart + length] = HDD_MV[srcStart:srcStart + length]
+            runStart = i
+
     # create the new file entry
-    newEntry = File(destName, destExtension, size, startUA, 0)
+    newEntry = File(destName, destExtension, size, dst[0], 0)
+    ROOT_INDEX[(newEntry.name, newEntry.extension)] = len(ROOT)
     ROOT.append(newEntry)
     print(f"{destFileName} copied successfully.")
 
 
+def handleUNKNOWN(command):
+    print("unknown command")
+    print("list of available commands:")
+    print("DIR | CREATE | DELETE | RENAME | COPY | EXIT")
+
+
+HANDLERS = {
+    "DIR": handleDIR,
+    "CREATE": handleCREATE,
+    "DELETE": handleDELETE,
+    "RENAME": handleRENAME,
+    "COPY": handleCOPY,
+}
+
+
 def handleCommand(command):
-    if command.startswith("DIR"):
-        handleDIR(command)
-    elif command.startswith("CREATE"):
-        handleCREATE(command)
-    elif command.startswith("DELETE"):
-        handleDELETE(command)
-    elif command.startswith("RENAME"):
-        handleRENAME(command)
-    elif command.startswith("COPY"):
-        handleCOPY(command)
-    else:
-        print("unknown command")
-        print("list of available commands:")
-        print("DIR | CREATE | DELETE | RENAME | COPY | EXIT")
+    # the first word selects the handler, matched case-insensitively
+    parts = command.split(None, 1)
+    op = parts[0].upper() if parts else ""
+    HANDLERS.get(op, handleUNKNOWN)(command)
 
 
 if __name__ == '__main__':
-    while True:
-        cmd = input("my_OS> ").strip()
-        if cmd.lower().startswith("exit"):
-            print("exiting program..")
-            break
-        else:
+    if not sys.stdin.isatty():
+        # batch mode for piped scripts: no prompt, lines are read straight from stdin
+        for line in sys.stdin:
+            cmd = line.strip()
+            if cmd.lower().startswith("exit"):
+                break
             handleCommand(cmd)
+    else:
+        while True:
+            cmd = input("my_OS> ").strip()
+            if cmd.lower().startswith("exit"):
+                print("exiting program..")
+                break
+            else:
+                handleCommand(cmd)